@@ -1,11 +1,18 @@
 import os
 import sqlite3
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
 
 # --- Configurações ---
-# ID do vídeo
-VIDEO_ID = "BYy278lrtNA" 
+# IDs dos vídeos monitorados (a API aceita até 50 IDs por requisição, pelo mesmo custo de cota)
+VIDEO_IDS = ["BYy278lrtNA"]
+
+# Máximo de IDs por requisição aceito pela API e de requisições em paralelo
+MAX_IDS_POR_REQUISICAO = 50
+MAX_REQUISICOES_PARALELAS = 8
 
 # Nome do banco de dados
 DB_NAME = "youtube_stats.db"
@@ -13,89 +20,212 @@ DB_NAME = "youtube_stats.db"
 # A chave de API será lida do "GitHub Secrets"
 API_KEY = os.environ.get("YOUTUBE_API_KEY")
 
+# Cliente da API, construído uma única vez por processo (ver _youtube())
+_YT = None
+
+
+def _connect():
+    """Abre uma conexão com o banco de dados já com os PRAGMAs de desempenho."""
+    conn = sqlite3.connect(DB_NAME)
+    # WAL: um único fsync por commit e leitores (dashboard) não bloqueiam o escritor
+    # O modo WAL fica gravado no arquivo, mas os demais PRAGMAs valem só por conexão
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Mantém o arquivo -wal pequeno: checkpoint a cada 1000 páginas e limite de 64 MB
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.execute("PRAGMA journal_size_limit=67108864")
+    return conn
+
+def _criar_tabela_stats(cursor, nome):
+    """Cria a tabela de estatísticas com o nome informado, se ela não existir."""
+    # 'timestamp' guarda os segundos desde a época (UTC) como INTEGER:
+    # ocupa menos espaço que o texto e as comparações são entre inteiros
+    # WITHOUT ROWID: a própria chave (vídeo, horário) organiza a B-tree da tabela,
+    # sem a rowid extra e servindo também como índice para as consultas do dashboard
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {nome} (
+        video_id TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        view_count INTEGER,
+        like_count INTEGER,
+        comment_count INTEGER,
+        PRIMARY KEY (video_id, timestamp)
+    ) WITHOUT ROWID;
+    """)
 
-def setup_database():
+def setup_database(conn):
     """Cria a tabela no banco de dados SQLite, se ela não existir."""
     print("Configurando banco de dados...")
-    conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
     
     # Cria a tabela
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS stats (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp DATETIME NOT NULL,
-        view_count INTEGER,
-        like_count INTEGER,
-        comment_count INTEGER
-    );
-    """)
+    _criar_tabela_stats(cursor, "stats")
+    
+    tipos = {linha[1]: linha[2] for linha in cursor.execute("PRAGMA table_info(stats)")}
+    
+    # Migração: bancos antigos não têm a coluna 'video_id'
+    # As coletas antigas são todas do primeiro vídeo monitorado
+    if "video_id" not in tipos:
+        cursor.execute("ALTER TABLE stats ADD COLUMN video_id TEXT")
+        cursor.execute("UPDATE stats SET video_id = ? WHERE video_id IS NULL", (VIDEO_IDS[0],))
+    
+    # Migração: bancos antigos têm a coluna 'id' (tabela com rowid) e/ou
+    # guardam o 'timestamp' como texto (DATETIME)
+    # O SQLite não altera o tipo de uma coluna nem a chave da tabela, então ela é recriada
+    if "id" in tipos or tipos["timestamp"] != "INTEGER":
+        print("Migrando tabela para o novo formato...")
+        _criar_tabela_stats(cursor, "stats_new")
+        # O CASE mantém os timestamps que já foram gravados como inteiros
+        cursor.execute("""
+        INSERT OR REPLACE INTO stats_new (video_id, timestamp, view_count, like_count, comment_count)
+        SELECT
+            video_id,
+            CASE WHEN typeof(timestamp) = 'integer' THEN timestamp
+                 ELSE CAST(strftime('%s', timestamp) AS INTEGER) END,
+            view_count, like_count, comment_count
+        FROM stats;
+        """)
+        cursor.execute("DROP TABLE stats")
+        # O índice das versões anteriores foi removido junto com a tabela (a chave primária o substitui)
+        cursor.execute("ALTER TABLE stats_new RENAME TO stats")
     
-    conn.commit()
-    conn.close()
     print("Banco de dados pronto.")
 
-def fetch_youtube_stats():
-    """Busca as estatísticas atuais do vídeo usando a API do YouTube."""
-    if not API_KEY:
-        raise ValueError("Chave de API do YouTube não encontrada. Configure o Secret 'YOUTUBE_API_KEY'.")
+def _youtube():
+    """Retorna o "serviço" da API do YouTube, construindo-o só na primeira chamada."""
+    global _YT
+    if _YT is None:
+        # static_discovery usa o documento de descoberta que vem com a biblioteca,
+        # sem buscá-lo pela rede
+        _YT = build('youtube', 'v3', developerKey=API_KEY, cache_discovery=False, static_discovery=True)
+    return _YT
 
-    print(f"Buscando dados para o vídeo ID: {VIDEO_ID}")
-    
-    # Constrói o "serviço" da API
-    youtube = build('youtube', 'v3', developerKey=API_KEY)
+def _fetch_lote(ids, http=None):
+    """Busca as estatísticas de um lote de até 50 vídeos em uma única chamada."""
+    # Pega o "serviço" da API
+    youtube = _youtube()
     
     # Faz a requisição
+    # httplib2.Http não é thread-safe: em paralelo, cada chamada recebe o seu próprio `http`
+    # (criado com build_http(), que tem o mesmo timeout padrão do cliente da API)
     request = youtube.videos().list(
         part="statistics",
-        id=VIDEO_ID
+        id=",".join(ids),
+        maxResults=MAX_IDS_POR_REQUISICAO
     )
-    response = request.execute()
+    response = request.execute(http=http)
+    return response.get('items', [])
+
+def fetch_youtube_stats():
+    """Busca as estatísticas atuais dos vídeos usando a API do YouTube."""
+    if not API_KEY:
+        raise ValueError("Chave de API do YouTube não encontrada. Configure o Secret 'YOUTUBE_API_KEY'.")
+
+    print(f"Buscando dados para os vídeos IDs: {', '.join(VIDEO_IDS)}")
     
-    if not response.get('items'):
-        raise ValueError(f"Não foi possível encontrar o vídeo com ID: {VIDEO_ID}")
-        
-    # Extrai as estatísticas
-    stats = response['items'][0]['statistics']
+    # Divide os IDs em lotes de até 50 (limite da API por chamada)
+    lotes = [
+        VIDEO_IDS[i:i + MAX_IDS_POR_REQUISICAO]
+        for i in range(0, len(VIDEO_IDS), MAX_IDS_POR_REQUISICAO)
+    ]
+    
+    if len(lotes) == 1:
+        # Caso comum: todos os vídeos em uma única chamada
+        items = _fetch_lote(lotes[0])
+    else:
+        # Mais de 50 vídeos: as chamadas são limitadas pela latência da rede,
+        # então rodam em paralelo, cada uma com a sua própria conexão HTTP
+        _youtube() # Constrói o cliente antes de abrir as threads
+        with ThreadPoolExecutor(max_workers=MAX_REQUISICOES_PARALELAS) as executor:
+            resultados = executor.map(lambda lote: _fetch_lote(lote, build_http()), lotes)
+            items = [item for resultado in resultados for item in resultado]
     
-    # Retorna um dicionário limpo
+    if not items:
+        raise ValueError(f"Não foi possível encontrar os vídeos com IDs: {', '.join(VIDEO_IDS)}")
+    
+    encontrados = {item['id'] for item in items}
+    for video_id in VIDEO_IDS:
+        if video_id not in encontrados:
+            print(f"Aviso: não foi possível encontrar o vídeo com ID: {video_id}")
+        
+    # Extrai as estatísticas e retorna um dicionário limpo por vídeo
     # Usa .get() para evitar erros se um campo não existir (ex: comments desativados)
-    return {
-        "views": int(stats.get('viewCount', 0)),
-        "likes": int(stats.get('likeCount', 0)),
-        "comments": int(stats.get('commentCount', 0))
-    }
+    return [
+        {
+            "video_id": item['id'],
+            "views": int(item['statistics'].get('viewCount', 0)),
+            "likes": int(item['statistics'].get('likeCount', 0)),
+            "comments": int(item['statistics'].get('commentCount', 0))
+        }
+        for item in items
+    ]
 
-def save_stats_to_db(stats):
-    """Salva as estatísticas coletadas no banco de dados SQLite."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+def save_stats_batch(conn, rows):
+    """Salva várias coletas de uma vez, em um único executemany."""
+    # Pega o horário atual em segundos desde a época (usado quando a linha não traz o próprio horário)
+    timestamp = int(datetime.datetime.now().timestamp())
     
-    # Pega o horário atual
-    timestamp = datetime.datetime.now()
+    # Pula os vídeos cujas estatísticas não mudaram desde a última coleta
+    # (os números do YouTube às vezes ficam parados); a busca usa a chave primária
+    novas = []
+    for r in rows:
+        anterior = conn.execute("""
+        SELECT view_count, like_count, comment_count FROM stats
+        WHERE video_id = ? ORDER BY timestamp DESC LIMIT 1;
+        """, (r['video_id'],)).fetchone()
+        if anterior == (r['views'], r['likes'], r['comments']):
+            print(f"Sem mudanças desde a última coleta, nada a salvar: {r}")
+        else:
+            novas.append(r)
     
-    # Insere os dados
-    cursor.execute("""
-    INSERT INTO stats (timestamp, view_count, like_count, comment_count)
-    VALUES (?, ?, ?, ?);
-    """, (timestamp, stats['views'], stats['likes'], stats['comments']))
+    if not novas:
+        return
     
-    conn.commit()
-    conn.close()
-    print(f"Dados salvos com sucesso: {stats}")
+    params = [
+        (r['video_id'], r.get('timestamp', timestamp), r['views'], r['likes'], r['comments'])
+        for r in novas
+    ]
+    
+    # Insere os dados (o conn.execute* reaproveita o cache de statements do SQLite)
+    # OR REPLACE: uma segunda coleta do mesmo vídeo no mesmo segundo substitui a anterior
+    conn.executemany("""
+    INSERT OR REPLACE INTO stats (video_id, timestamp, view_count, like_count, comment_count)
+    VALUES (?, ?, ?, ?, ?);
+    """, params)
+    print(f"Dados salvos com sucesso: {novas}")
+
+def save_stats_to_db(conn, stats):
+    """Salva as estatísticas coletadas no banco de dados SQLite."""
+    save_stats_batch(conn, [stats])
 
 def main():
     """Função principal para orquestrar o script."""
     print("Iniciando script de coleta...")
+    conn = None
     try:
-        setup_database()
+        # Busca os dados antes de travar o banco, para não segurar o lock durante a requisição
         stats_data = fetch_youtube_stats()
-        save_stats_to_db(stats_data)
+
+        # Uma única conexão e uma única transação (um só commit/fsync por execução)
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        setup_database(conn)
+        save_stats_batch(conn, stats_data)
+        conn.commit()
+        # Atualiza as estatísticas do planejador de consultas (só em uma execução bem-sucedida)
+        conn.execute("PRAGMA optimize")
         print("Coleta concluída com sucesso.")
     except Exception as e:
+        if conn is not None:
+            conn.rollback()
         print(f"Erro durante a execução: {e}")
         
         raise e 
+    finally:
+        if conn is not None:
+            conn.close()
 
 if __name__ == "__main__":
     main()
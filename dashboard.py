@@ -3,6 +3,8 @@ import pandas as pd
 import sqlite3
 import os
 
+from coletor import DB_NAME, VIDEO_IDS
+
 # --- Configurações da Página ---
 # Será o primeiro comando do Streamlit
 st.set_page_config(
@@ -12,13 +14,34 @@ st.set_page_config(
 )
 
 # --- Constantes ---
-DB_NAME = "youtube_stats.db"
+# Tipos numéricos menores onde é seguro: likes e comentários cabem em int32 e as taxas em float32,
+# o que reduz a memória do DataFrame e o volume enviado ao navegador
+# As views ficam em int64: vídeos populares passam de 2.147.483.647 e o int32 estouraria sem aviso
+TIPOS_CONTAGEM = {"view_count": "int64", "like_count": "int32", "comment_count": "int32"}
+TIPOS_INSIGHTS = {"views_por_hora": "int64", "taxa_engajamento (%)": "float32", "discussao_por_like": "float32"}
 
 # --- Funções de Lógica ---
 
-@st.cache_data(ttl=600) # Faz cache dos dados por 10 minutos (600 segundos)
-def carregar_dados():
-    """Carrega os dados do banco de dados SQLite."""
+def _timestamp_sql(ts):
+    """Converte um timestamp do Pandas para o formato gravado pelo coletor no banco."""
+    # O coletor grava segundos desde a época (UTC)
+    return int(ts.timestamp())
+
+# Uma única conexão (somente leitura) reaproveitada entre os reruns
+# O ttl reabre o arquivo a cada 10 minutos, como o carregar_dados: o coletor faz commit
+# de um novo youtube_stats.db a cada hora e a conexão antiga continuaria lendo o arquivo substituído
+@st.cache_resource(ttl=600)
+def get_conn():
+    """Abre a conexão somente leitura com o banco de dados SQLite."""
+    conn = sqlite3.connect(f"file:{DB_NAME}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only=1")
+    # Espera o coletor terminar de escrever em vez de falhar com "database is locked"
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+@st.cache_data(ttl=600, max_entries=4) # Faz cache dos dados por 10 minutos (600 segundos), guardando no máximo 4 resultados
+def carregar_dados(video_id, desde=None):
+    """Carrega do banco de dados SQLite as coletas do vídeo feitas depois de `desde` (ou todas, se None)."""
     
     # Verifica se o arquivo do banco de dados existe
     if not os.path.exists(DB_NAME):
@@ -27,72 +50,93 @@ def carregar_dados():
         return pd.DataFrame(columns=["timestamp", "view_count", "like_count", "comment_count"])
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        # Carrega os dados para um DataFrame do Pandas
-        df = pd.read_sql_query("SELECT * FROM stats", conn)
-        conn.close()
-        
-        # Converte a coluna 'timestamp' para o formato datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Só as coletas novas, quando `desde` é informado
+        consulta = "SELECT timestamp, view_count, like_count, comment_count FROM stats WHERE video_id = ?"
+        params = [video_id]
+        if desde is not None:
+            consulta += " AND timestamp > ?"
+            params.append(desde)
+        # ORDER BY deixa as coletas em ordem cronológica (a chave primária já está nessa ordem)
+        consulta += " ORDER BY timestamp"
         
-        # Define o timestamp como o índice do DataFrame
-        df.set_index('timestamp', inplace=True)
+        # Carrega os dados para um DataFrame do Pandas em uma única passada:
+        # parse_dates converte a coluna 'timestamp' (segundos desde a época) para datetime,
+        # dtype aplica os tipos de TIPOS_CONTAGEM (views em int64) e index_col define o timestamp como o índice
+        df = pd.read_sql_query(
+            consulta,
+            get_conn(),
+            params=params,
+            parse_dates={"timestamp": "s"},
+            dtype=TIPOS_CONTAGEM,
+            index_col="timestamp"
+        )
         
         return df
     except Exception as e:
         st.error(f"Erro ao ler o banco de dados: {e}")
         return pd.DataFrame(columns=["timestamp", "view_count", "like_count", "comment_count"])
 
-def calcular_insights(df):
-    """Calcula as 3 análises (insights) com base no DataFrame."""
+def atualizar_dados(video_id):
+    """Mantém o DataFrame do vídeo na sessão e busca no banco apenas as coletas novas."""
+    chave = f"stats_df_{video_id}"
+    df = st.session_state.get(chave)
+    
+    if df is None or df.empty:
+        df = carregar_dados(video_id)
+    else:
+        novos = carregar_dados(video_id, _timestamp_sql(df.index.max()))
+        if not novos.empty:
+            df = pd.concat([df, novos])
+    
+    st.session_state[chave] = df
+    return df
+
+# O hash do DataFrame usa só o tamanho e a última coleta (O(1)), em vez de todos os valores
+@st.cache_data(ttl=600, max_entries=4, hash_funcs={pd.DataFrame: lambda d: (len(d), d.index.max())})
+def calcular_insights(df, video_id):
+    """Calcula as 3 análises (insights) do vídeo com base no DataFrame."""
     if df.empty:
         # Retorna N/A se não houver dados
         return (pd.DataFrame(),) * 3 # Retorna 3 dataframes vazios
     
+    # Os 3 insights saem de uma única consulta, calculados pelo próprio SQLite
     # Insight 1: "Velocidade Viral" (Novos Views por Hora)
-    # diff() calcula a diferença entre uma linha e a linha anterior
-    df_insights = df.copy()
-    df_insights['views_por_hora'] = df_insights['view_count'].diff().fillna(0)
-    
-    # Insight 2: "Taxa de Engajamento" (Likes / Views)
-    # Usa os dados *totais* para ter uma taxa estável
-    # Multiplica por 100 para ter a porcentagem
-    df_insights['taxa_engajamento (%)'] = (df_insights['like_count'] / df_insights['view_count']) * 100
-    
+    #   LAG() pega o valor da coleta anterior (o mesmo que o diff() do Pandas)
+    # Insight 2: "Taxa de Engajamento" (Likes / Views), em porcentagem
     # Insight 3: "Poder de Discussão" (Comentários / Likes)
-    df_insights['discussao_por_like'] = df_insights['comment_count'] / df_insights['like_count']
+    # NULLIF evita a divisão por zero (ex: 0 likes) devolvendo NULL no lugar de infinito
+    # O filtro em 'timestamp' mantém os insights alinhados com os dados já carregados
+    # Só as 3 colunas derivadas são lidas: as contagens brutas já estão em `df`
+    consulta = """
+    SELECT
+        timestamp,
+        COALESCE(view_count - LAG(view_count) OVER (ORDER BY timestamp), 0) AS views_por_hora,
+        100.0 * like_count / NULLIF(view_count, 0) AS "taxa_engajamento (%)",
+        1.0 * comment_count / NULLIF(like_count, 0) AS discussao_por_like
+    FROM stats
+    WHERE video_id = ? AND timestamp <= ?
+    ORDER BY timestamp;
+    """
+    
+    df_insights = pd.read_sql_query(
+        consulta,
+        get_conn(),
+        params=[video_id, _timestamp_sql(df.index.max())],
+        parse_dates={"timestamp": "s"},
+        dtype=TIPOS_INSIGHTS,
+        index_col="timestamp"
+    )
     
-    # Limpa dados infinitos (caso haja divisão por zero, ex: 0 likes)
-    df_insights.replace([float('inf'), float('-inf')], pd.NA, inplace=True)
-
     return df_insights
 
-# --- Interface Visual (O Dashboard) ---
-
-st.title("📊 Dashboard de Análise de Vídeo do YouTube")
-st.markdown(f"Analisando os dados coletados do arquivo `{DB_NAME}`.")
+# --- Seções do Dashboard ---
+# As seções ainda não têm widgets (o seletor de vídeo fica fora delas, pois também muda os
+# dados e as métricas); o @st.fragment prepara o terreno para que widgets adicionados aqui
+# rodem de novo só a própria seção, sem recarregar os dados nem reenviar os outros gráficos
 
-# Carrega os dados
-df_bruto = carregar_dados()
-df_insights = calcular_insights(df_bruto)
-
-if df_bruto.empty:
-    st.warning("Ainda não há dados para exibir. O coletor precisa rodar pelo menos uma vez.")
-else:
-    # --- Métricas Principais (Visão Geral) ---
-    st.header("📈 Métricas Atuais (Última Coleta)")
-    
-    # Pega os valores da última linha (coleta mais recente)
-    ultima_coleta = df_bruto.iloc[-1]
-    
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Total de Visualizações", f"{int(ultima_coleta['view_count']):,}")
-    col2.metric("Total de Likes", f"{int(ultima_coleta['like_count']):,}")
-    col3.metric("Total de Comentários", f"{int(ultima_coleta['comment_count']):,}")
-    
-    st.divider() # Linha divisória
-    
-    # --- As 3 Análises ---
+@st.fragment
+def render_insights(df_insights):
+    """Mostra os gráficos dos 3 insights."""
     st.header("💡 Os 3 Insights Principais")
 
     # --- Análise 1 ---
@@ -122,12 +166,51 @@ else:
     """)
     # Usa .dropna() para remover valores N/A (divisão por zero) do gráfico
     st.line_chart(df_insights['discussao_por_like'].dropna())
-    
-    st.divider()
 
-    # --- Dados Brutos ---
+@st.fragment
+def render_dados_brutos(df_bruto):
+    """Mostra a tabela com os dados brutos coletados."""
     st.header("🗃️ Dados Brutos Coletados")
     with st.expander("Clique para ver a tabela de dados completa"):
         # Mostra o dataframe (tabela) interativo
-        st.dataframe(df_bruto.sort_index(ascending=False)) # Mostra os mais recentes primeiro
+        # Os dados já vêm em ordem cronológica, então basta inverter (sem ordenar de novo)
+        st.dataframe(df_bruto.iloc[::-1]) # Mostra os mais recentes primeiro
+
+# --- Interface Visual (O Dashboard) ---
+
+st.title("📊 Dashboard de Análise de Vídeo do YouTube")
+st.markdown(f"Analisando os dados coletados do arquivo `{DB_NAME}`.")
+
+# Escolhe o vídeo (o seletor só aparece quando há mais de um vídeo monitorado)
+if len(VIDEO_IDS) > 1:
+    video_id = st.sidebar.selectbox("Vídeo analisado", VIDEO_IDS)
+else:
+    video_id = VIDEO_IDS[0]
+
+# Carrega os dados
+df_bruto = atualizar_dados(video_id)
+df_insights = calcular_insights(df_bruto, video_id)
+
+if df_bruto.empty:
+    st.warning("Ainda não há dados para exibir. O coletor precisa rodar pelo menos uma vez.")
+else:
+    # --- Métricas Principais (Visão Geral) ---
+    st.header("📈 Métricas Atuais (Última Coleta)")
+    
+    # Pega os valores da última linha (coleta mais recente)
+    ultima_coleta = df_bruto.iloc[-1]
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total de Visualizações", f"{int(ultima_coleta['view_count']):,}")
+    col2.metric("Total de Likes", f"{int(ultima_coleta['like_count']):,}")
+    col3.metric("Total de Comentários", f"{int(ultima_coleta['comment_count']):,}")
+    
+    st.divider() # Linha divisória
+    
+    # --- As 3 Análises ---
+    render_insights(df_insights)
+    
+    st.divider()
 
+    # --- Dados Brutos ---
+    render_dados_brutos(df_bruto)